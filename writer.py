@@ -1,21 +1,23 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import yaml
 import anthropic
 import datetime
-from docx import Document
-from docx.shared import Pt, RGBColor
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-import os
-import fitz  # PyMuPDF for PDF parsing
-import pandas as pd
 import io
 from pathlib import Path
 import json
 import re
+import string
+import threading
 import time
 from PIL import Image
 import base64
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+import functools
 import hashlib
+import itertools
+import zipfile
 
 # -------------- PASSWORD PROTECTION ----------------
 # -------------- PASSWORD PROTECTION (FIXED FOR STREAMLIT CLOUD) ----------------
@@ -125,89 +127,197 @@ if not check_password():
 
 # -------------- CONFIG ----------------
 ANTHROPIC_KEY = st.secrets["api_keys"]["anthropic_api_key"]
-anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_KEY)
 
+@st.cache_resource
+def get_anthropic_client():
+    """Create the Anthropic client once so its connection pool survives reruns"""
+    # The SDK retries 429/5xx (including 529 overloaded) with exponential backoff and jitter
+    return anthropic.Anthropic(api_key=ANTHROPIC_KEY, max_retries=5)
+
+anthropic_client = get_anthropic_client()
+
+CLAUDE_MODEL = "claude-sonnet-4-5-20250929"
+CLAUDE_FAST_MODEL = "claude-haiku-4-5-20251001"  # Cheap model for mechanical tasks
+CACHE_DIR = Path("exports/.cache")
+CACHE_TTL_SECONDS = 86400  # On-disk responses older than a day are regenerated
+
+# libyaml's C loader when PyYAML was built with it, otherwise the pure-Python one
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+@st.cache_data(ttl=3600)
 def load_client_config(client_name):
-    with open(f"clients/{client_name}.yaml", "r") as file:
-        return yaml.safe_load(file)
+    return yaml.load(Path(f"clients/{client_name}.yaml").read_bytes(), Loader=_YAML_LOADER)
 
 # -------------- HISTORY MANAGEMENT ----------------
 def save_to_history(title, articles, keywords, timestamp):
     """Save generated blog to history"""
     if 'blog_history' not in st.session_state:
-        st.session_state.blog_history = []
+        st.session_state.blog_history = collections.deque(maxlen=10)
     
     history_entry = {
         'timestamp': timestamp,
         'title': title,
         'articles': articles,
         'keywords': keywords,
-        'id': len(st.session_state.blog_history)
+        # Stable across trimming, unlike a position-based id, so sidebar button keys stay unique
+        'id': hashlib.blake2b(f"{timestamp}|{title}".encode(), digest_size=8).hexdigest()
     }
     
-    st.session_state.blog_history.insert(0, history_entry)  # Add to beginning
-    
-    # Keep only last 10 entries
-    if len(st.session_state.blog_history) > 10:
-        st.session_state.blog_history = st.session_state.blog_history[:10]
+    # Add to beginning - the deque drops the oldest entry beyond the last 10
+    st.session_state.blog_history.appendleft(history_entry)
+
+def load_history_entry(entry):
+    """Make a history entry the current blog (used as a button callback)"""
+    st.session_state.current_articles = entry['articles']
+    st.session_state.current_title = entry['title']
+    st.session_state.current_keywords = entry['keywords']
+    st.session_state.current_keywords_str = ', '.join(entry['keywords'])
+    st.session_state.loaded_from_history = True
+    # The articles on screen no longer match the form inputs
+    st.session_state.pop('last_input_key', None)
+    refresh_display_cache()
 
 # -------------- FILE PROCESSING ----------------
-def process_uploaded_file(uploaded_file):
-    """Process uploaded file and extract text content"""
-    if uploaded_file is None:
-        return ""
-    
-    file_extension = uploaded_file.name.split('.')[-1].lower()
-    
-    try:
-        if file_extension == 'pdf':
-            # Process PDF
-            pdf_document = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-            text = ""
-            for page_num in range(pdf_document.page_count):
-                page = pdf_document[page_num]
-                text += page.get_text()
-            pdf_document.close()
-            return text
-        
-        elif file_extension == 'docx':
-            # Process DOCX
-            doc = Document(uploaded_file)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
-        
-        elif file_extension == 'txt':
-            # Process TXT
-            return str(uploaded_file.read(), "utf-8")
+SPREADSHEET_CHUNK_ROWS = 50_000
+EXCEL_STATS_ROWS = 10_000  # Excel can't be streamed, so statistics come from the leading rows
+MAX_STATS_COLUMNS = 10  # Wide sheets only get statistics for their first numeric columns
+
+def _accumulate_numeric_stats(stats, chunk):
+    """Merge count/mean/M2/min/max of a chunk's numeric columns into running totals"""
+    for col in chunk.select_dtypes(include=['number']).columns:
+        if col not in stats and len(stats) >= MAX_STATS_COLUMNS:
+            continue
+        values = chunk[col].dropna()
+        n = len(values)
+        if n == 0:
+            continue
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        if col not in stats:
+            stats[col] = [n, mean, m2, values.min(), values.max()]
+            continue
+        # Combine with the running totals (parallel variance formula)
+        count, run_mean, run_m2, low, high = stats[col]
+        total = count + n
+        delta = mean - run_mean
+        stats[col] = [
+            total,
+            run_mean + delta * n / total,
+            run_m2 + m2 + delta ** 2 * count * n / total,
+            min(low, values.min()),
+            max(high, values.max())
+        ]
+
+def _summarize_spreadsheet(file_bytes, file_extension, include_stats=True):
+    """Summarise a spreadsheet without loading the whole sheet just for a 5-row preview"""
+    import pandas as pd  # Imported on first use - most sessions never upload a spreadsheet
+    
+    if file_extension == 'csv':
+        preview = pd.read_csv(io.BytesIO(file_bytes), nrows=5)
+        # Stream the file in chunks to count rows and gather statistics in constant memory
+        row_count = 0
+        running = {}
+        for chunk in pd.read_csv(io.BytesIO(file_bytes), chunksize=SPREADSHEET_CHUNK_ROWS):
+            row_count += len(chunk)
+            if include_stats:
+                _accumulate_numeric_stats(running, chunk)
+        numeric_stats = None
+        if running:
+            numeric_stats = pd.DataFrame({
+                col: {
+                    'count': count,
+                    'mean': mean,
+                    'std': (m2 / (count - 1)) ** 0.5 if count > 1 else float('nan'),
+                    'min': low,
+                    'max': high
+                }
+                for col, (count, mean, m2, low, high) in running.items()
+            })
+    else:
+        preview = pd.read_excel(io.BytesIO(file_bytes), nrows=5)
+        if file_extension == 'xls':
+            # Legacy .xls has no dimension record to read, so count a single parsed column
+            row_count = len(pd.read_excel(io.BytesIO(file_bytes), usecols=[0]))
+        else:
+            # Read-only mode reports the sheet dimensions without parsing every cell. pandas reads
+            # the first sheet (not necessarily the active one), so count that sheet's rows
+            from openpyxl import load_workbook
+            workbook = load_workbook(io.BytesIO(file_bytes), read_only=True)
+            sheet = workbook.worksheets[0]
+            total_rows = sheet.max_row
+            if not total_rows or total_rows <= 1:
+                # Missing or unreliable dimension record (some writers always store "A1") - count the rows
+                sheet.reset_dimensions()
+                total_rows = sum(1 for _ in sheet.iter_rows(values_only=True))
+            row_count = max(total_rows - 1, 0)
+            workbook.close()
         
-        elif file_extension in ['csv', 'xlsx', 'xls']:
-            # Process spreadsheet files
-            if file_extension == 'csv':
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-            
-            # Convert DataFrame to text summary
-            text = f"Data Summary:\n"
-            text += f"Shape: {df.shape[0]} rows, {df.shape[1]} columns\n"
-            text += f"Columns: {', '.join(df.columns.tolist())}\n\n"
-            text += "Sample Data:\n"
-            text += df.head().to_string()
-            
-            # Add basic statistics for numeric columns
-            numeric_cols = df.select_dtypes(include=['number']).columns
+        numeric_stats = None
+        if include_stats:
+            sample = pd.read_excel(io.BytesIO(file_bytes), nrows=EXCEL_STATS_ROWS)
+            numeric_cols = sample.select_dtypes(include=['number']).columns[:MAX_STATS_COLUMNS]
             if len(numeric_cols) > 0:
-                text += "\n\nNumeric Statistics:\n"
-                text += df[numeric_cols].describe().to_string()
-            
-            return text
+                numeric_stats = sample[numeric_cols].describe()
+    
+    # Convert DataFrame to text summary - collect the pieces and join once
+    parts = [
+        "Data Summary:\n",
+        f"Shape: {row_count} rows, {preview.shape[1]} columns\n",
+        f"Columns: {', '.join(map(str, preview.columns))}\n\n",
+        "Sample Data:\n",
+        # Tab-separated output goes through pandas' C CSV writer rather than the slow to_string layout
+        preview.to_csv(sep='\t', index=False)
+    ]
+    
+    # Add basic statistics for numeric columns
+    if numeric_stats is not None:
+        sampled = file_extension != 'csv' and row_count > EXCEL_STATS_ROWS
+        parts.append(f"\nNumeric Statistics{f' (first {EXCEL_STATS_ROWS} rows)' if sampled else ''}:\n")
+        parts.append(numeric_stats.to_csv(sep='\t', float_format='%.6g'))
+    
+    return "".join(parts)
+
+# Process-wide cache, so bound it - every session's uploads would otherwise stay in memory
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def _extract_text(file_digest, _file_bytes, file_extension, include_stats=True):
+    """Extract text from raw file bytes; cached by content digest so each unique file is parsed only once"""
+    # _file_bytes is underscore-prefixed so Streamlit keys on the digest instead of re-hashing the file
+    if file_extension == 'pdf':
+        import fitz  # PyMuPDF for PDF parsing
         
-        else:
-            st.error(f"Unsupported file type: {file_extension}")
-            return ""
+        # Plain-text defaults, but join words hyphenated across lines and expand ligatures into letters
+        flags = (fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES) | fitz.TEXT_DEHYPHENATE
+        # Process PDF - collect pages in a list and join once instead of repeated concatenation
+        with fitz.open(stream=_file_bytes, filetype="pdf") as pdf_document:
+            return "\n".join(page.get_text("text", flags=flags) for page in pdf_document)
+    
+    elif file_extension == 'docx':
+        # Process DOCX
+        from docx import Document
+        doc = Document(io.BytesIO(_file_bytes))
+        return "\n".join(paragraph.text for paragraph in doc.paragraphs)
+    
+    elif file_extension == 'txt':
+        # Process TXT
+        return str(_file_bytes, "utf-8")
+    
+    elif file_extension in ['csv', 'xlsx', 'xls']:
+        # Process spreadsheet files
+        return _summarize_spreadsheet(_file_bytes, file_extension, include_stats)
+    
+    raise ValueError(f"Unsupported file type: {file_extension}")
+
+def process_uploaded_bytes(file_bytes, file_extension, include_stats=True):
+    """Extract text content from the bytes of an uploaded file"""
+    if not file_bytes:
+        return ""
     
+    try:
+        file_digest = hashlib.blake2b(file_bytes, digest_size=16).hexdigest()
+        return _extract_text(file_digest, file_bytes, file_extension, include_stats)
+    except ValueError as e:
+        st.error(str(e))
+        return ""
     except Exception as e:
         st.error(f"Error processing file: {str(e)}")
         return ""
@@ -243,15 +353,30 @@ def process_logo(uploaded_logo):
         st.error(f"Error processing logo: {str(e)}")
         return None
 
+# -------------- KEYWORDS ----------------
+@functools.lru_cache(maxsize=64)
+def parse_extra_keywords(custom_keywords):
+    """Split a comma-separated keyword string into lower-cased keywords"""
+    return tuple(kw.strip().lower() for kw in custom_keywords.split(",") if kw.strip())
+
+def _merge_keywords(base_keywords, custom_keywords):
+    """Return the base keywords plus comma-separated custom keywords, skipping case-insensitive duplicates"""
+    # Copy so the client config's keyword list is never mutated between reruns
+    base_keywords = list(base_keywords)
+    if custom_keywords:
+        seen = {kw.casefold() for kw in base_keywords}
+        for kw in parse_extra_keywords(custom_keywords):
+            # casefold only for the comparison - it would turn e.g. "Straße" into "strasse" in the prompt
+            folded = kw.casefold()
+            if folded not in seen:
+                base_keywords.append(kw)
+                seen.add(folded)
+    return base_keywords
+
 # -------------- TITLE GENERATION ----------------
 def generate_title_only(topic, client_cfg, custom_keywords=""):
     """Generate only a title for the given topic"""
-    base_keywords = client_cfg.get("keywords", [])
-    if custom_keywords:
-        additional_keywords = [kw.strip().lower() for kw in custom_keywords.split(",") if kw.strip()]
-        for kw in additional_keywords:
-            if kw.lower() not in [k.lower() for k in base_keywords]:
-                base_keywords.append(kw)
+    base_keywords = _merge_keywords(client_cfg.get("keywords", []), custom_keywords)
     keywords = ", ".join(base_keywords)
     
     # Add variation to avoid repetition
@@ -278,41 +403,23 @@ Requirements:
 Respond with ONLY the title, nothing else. No explanation, no "Title:" prefix, just the title text.
 '''
     
-    try:
-        response = anthropic_client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=100,
-            temperature=0.9,  # Higher temperature for more variation
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.content[0].text.strip()
-    except Exception as e:
-        st.error(f"Error generating title: {str(e)}")
-        return None
+    # Include the generation count so "Generate another title" still gets a fresh title
+    title = cached_call(
+        prompt,
+        model=CLAUDE_FAST_MODEL,  # A short title doesn't need the full article model
+        max_tokens=100,
+        temperature=0.9,  # Higher temperature for more variation
+        cache_tag=f"title-{st.session_state.get('title_generation_count', 0)}"
+    )
+    return title.strip() if title else None
 
 # -------------- CLAUDE PROMPT HELPER ----------------
-def generate_prompt(title, facts, quotes, ai_opt, client_cfg, custom_keywords="", document_content="", language="UK", word_range="750-1500", include_hiring_impact=False, generate_title=False):
-    base_keywords = client_cfg.get("keywords", [])
-    if custom_keywords:
-        additional_keywords = [kw.strip().lower() for kw in custom_keywords.split(",") if kw.strip()]
-        base_keywords_lower = [kw.lower() for kw in base_keywords]
-        for kw in additional_keywords:
-            if kw not in base_keywords_lower:
-                base_keywords.append(kw)
-    keywords = ", ".join(base_keywords)
-    
+@functools.lru_cache(maxsize=32)
+def _prompt_templates(ai_opt, include_hiring_impact, language, target_words):
+    """Build the static instructions and the variable-block template once per prompt shape"""
     language_instruction = "UK English" if language == "UK" else "US English"
     spelling_note = "(CRITICAL: use British spelling throughout - 's' instead of 'z' in words like recognise, organisation, realise, optimise, analyse, specialise, etc.)" if language == "UK" else "(use American spelling - 'z' instead of 's' in words like recognize, organization, realize, optimize, analyze, specialize, etc.)"
     
-    # Parse word range and OVERSHOOT to compensate
-    try:
-        min_words, max_words = map(int, word_range.split('-'))
-    except:
-        min_words, max_words = 750, 1500
-    
-    # OVERSHOOT the target to ensure we hit minimum
-    target_words = max_words  # Just aim for maximum
-    
     hiring_impact_section = ""
     if include_hiring_impact:
         hiring_impact_section = """
@@ -321,14 +428,13 @@ def generate_prompt(title, facts, quotes, ai_opt, client_cfg, custom_keywords=""
 Detailed section on how this affects recruitment, talent acquisition, hiring managers, employer branding, and recruitment strategies
 """
     
+    # The prompt is split into a static block (formatting rules and section template) that is
+    # byte-identical across UK/US versions and regenerations, and a small variable block.
+    # The static block is sent first and marked for Anthropic's prompt cache.
+    
     # AI-FRIENDLY VERSION
     if ai_opt:
-        prompt = f'''
-Write a comprehensive {target_words}-word blog article in {language_instruction} {spelling_note} about: "{title}"
-
-IMPORTANT: Write EXACTLY {target_words} words. This is a hard requirement.
-CRITICAL SPELLING REQUIREMENT: You must use {language_instruction} spelling consistently throughout the entire article.
-
+        static_part = f'''
 FORMAT FOR AI-FRIENDLY/AEO OPTIMIZED CONTENT:
 
 Structure Requirements:
@@ -366,21 +472,23 @@ Required Sections (use these as question-based headings):
 6. **Frequently Asked Questions** - Exactly 5 Q&A pairs
 7. **TL;DR Summary** - 3-4 bullet points summarizing key points
 
-Keywords to incorporate naturally: {keywords}
-{f"Include these facts: {facts}" if facts else ""}
-{f"Include these quotes: {quotes}" if quotes else ""}
-{f"Reference this material: {document_content[:500]}" if document_content else ""}
-
 Remember: Use real examples and data only. Keep paragraphs short. Make it scannable.'''
-    
-    # STANDARD VERSION
-    else:
-        prompt = f'''
-Write a comprehensive {target_words}-word blog article in {language_instruction} {spelling_note} about: "{title}"
+        
+        variable_template = f'''
+Write a comprehensive {target_words}-word blog article in {language_instruction} {spelling_note} about: "$title"
 
 IMPORTANT: Write EXACTLY {target_words} words. This is a hard requirement.
 CRITICAL SPELLING REQUIREMENT: You must use {language_instruction} spelling consistently throughout the entire article.
+Follow the AI-friendly format above.
 
+Keywords to incorporate naturally: $keywords
+$facts_line
+$quotes_line
+$document_line'''
+    
+    # STANDARD VERSION
+    else:
+        static_part = f'''
 Include these sections:
 - **[Opening/Lead Section - use a descriptive title, NOT "Introduction"]**:
 
@@ -410,53 +518,319 @@ Requirements:
 - Include specific examples and expert insights throughout
 - Use transitions and elaborate on every point
 - Add single line after headings
-- Format headings with ** for bold (e.g., **Understanding the Digital Transformation**)
-- Incorporate these keywords naturally: {keywords}
-{f"- Include these facts: {facts}" if facts else ""}
-{f"- Include these quotes: {quotes}" if quotes else ""}
-{f"- Reference this material: {document_content[:500]}" if document_content else ""}
+- Format headings with ** for bold (e.g., **Understanding the Digital Transformation**)'''
+        
+        variable_template = f'''
+Write a comprehensive {target_words}-word blog article in {language_instruction} {spelling_note} about: "$title"
+
+IMPORTANT: Write EXACTLY {target_words} words. This is a hard requirement.
+CRITICAL SPELLING REQUIREMENT: You must use {language_instruction} spelling consistently throughout the entire article.
+Use the sections and requirements above, and also:
+- Incorporate these keywords naturally: $keywords
+$facts_line
+$quotes_line
+$document_line
 
 Write the full {target_words}-word article now:'''
     
-    return prompt, base_keywords
+    return static_part, variable_template
 
-# -------------- ARTICLE GENERATION WITH RETRY LOGIC ----------------
-def call_claude(prompt, max_tokens=8000, retry_count=3):
-    """Call Claude with retry logic for 529 errors"""
-    for attempt in range(retry_count):
+def parse_word_range(word_range):
+    """Parse a "min-max" word range into ints, falling back to 750-1500"""
+    try:
+        min_words, max_words = map(int, word_range.split('-'))
+    except ValueError:
+        min_words, max_words = 750, 1500
+    return min_words, max_words
+
+def generate_prompt(title, facts, quotes, ai_opt, client_cfg, custom_keywords="", document_content="", language="UK", word_bounds=(750, 1500), include_hiring_impact=False, generate_title=False):
+    base_keywords = _merge_keywords(client_cfg.get("keywords", []), custom_keywords)
+    
+    # OVERSHOOT the target to ensure we hit minimum
+    _, target_words = word_bounds  # Just aim for maximum
+    
+    # Only the small per-request slots are filled in on each call
+    static_part, variable_template = _prompt_templates(ai_opt, include_hiring_impact, language, target_words)
+    bullet = "" if ai_opt else "- "
+    variable_part = string.Template(variable_template).substitute(
+        title=title,
+        keywords=", ".join(base_keywords),
+        facts_line=f"{bullet}Include these facts: {facts}" if facts else "",
+        quotes_line=f"{bullet}Include these quotes: {quotes}" if quotes else "",
+        document_line=f"{bullet}Reference this material: {document_content}" if document_content else ""
+    )
+    
+    return static_part, variable_part, base_keywords
+
+# -------------- RESPONSE CACHE ----------------
+def _cache_key(prompt, static_prefix, model, max_tokens, temperature, cache_tag, history=(), context=None):
+    """Hash the request parameters into a stable cache key"""
+    payload = json.dumps({
+        'model': model,
+        'static_prefix': static_prefix,
+        'history': history,
+        'context': context,
+        'prompt': prompt,
+        'max_tokens': max_tokens,
+        'temperature': temperature,
+        'tag': cache_tag
+    }, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+@st.cache_resource
+def _inflight_requests():
+    """Registry of Claude requests currently running, shared by every session"""
+    return {}, threading.Lock()
+
+def _single_flight(key, request):
+    """Run request() once per key; concurrent callers with the same key wait for its result"""
+    inflight, lock = _inflight_requests()
+    with lock:
+        future = inflight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = inflight[key] = Future()
+    
+    if not is_leader:
+        response = future.result()
+        if response:
+            return response
+        # The first request failed or was interrupted - make our own attempt
+        return request()
+    
+    # Run in the caller's thread so warnings and streaming still reach its page
+    response = None
+    try:
+        response = request()
+    finally:
+        with lock:
+            inflight.pop(key, None)
+        future.set_result(response)
+    return response
+
+def cached_call(prompt, model=CLAUDE_MODEL, max_tokens=8000, temperature=0.7, cache_tag="", static_prefix=None, placeholder=None, history=(), context=None):
+    """Return the cached response for an identical request, calling Claude only on a miss"""
+    key = _cache_key(prompt, static_prefix, model, max_tokens, temperature, cache_tag, history, context)
+    
+    if key in st.session_state.llm_cache:
+        return st.session_state.llm_cache[key]
+    
+    # Fall back to the on-disk cache shared across sessions
+    cache_file = CACHE_DIR / f"{key}.json"
+    if cache_file.exists():
         try:
-            response = anthropic_client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=max_tokens,
-                temperature=0.7,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            mtime = cache_file.stat().st_mtime
+            if time.time() - mtime > CACHE_TTL_SECONDS:
+                raise ValueError("expired")
+            # Entries written before this session cleared its cache don't count
+            if mtime < st.session_state.get('cache_cleared_at', 0.0):
+                raise ValueError("cleared")
+            response = json.loads(cache_file.read_text(encoding="utf-8"))['response']
+            st.session_state.llm_cache[key] = response
+            return response
+        except (OSError, ValueError, KeyError):
+            pass  # Expired or unreadable entry - regenerate and overwrite it
+    
+    # Identical requests already running (double-click, second tab) share one API call
+    response = _single_flight(key, lambda: _request_claude(
+        prompt, model, max_tokens, temperature, static_prefix, placeholder, history, context
+    ))
+    if response:
+        st.session_state.llm_cache[key] = response
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_file.write_text(json.dumps({
+                'model': model,
+                'static_prefix': static_prefix,
+                'history': history,
+                'context': context,
+                'prompt': prompt,
+                'max_tokens': max_tokens,
+                'temperature': temperature,
+                'response': response
+            }), encoding="utf-8")
+            _prune_disk_cache()
+        except OSError:
+            pass  # Disk cache is best-effort
+    
+    return response
+
+def _prune_disk_cache():
+    """Delete disk cache entries past their TTL - an expired key that never comes up again is never overwritten"""
+    cutoff = time.time() - CACHE_TTL_SECONDS
+    for cache_file in CACHE_DIR.glob("*.json"):
+        try:
+            if cache_file.stat().st_mtime < cutoff:
+                cache_file.unlink()
+        except OSError:
+            pass  # Removed concurrently by another session
+
+def clear_generation_cache():
+    """Forget this session's cached Claude responses and pipeline results so the next run calls the API again"""
+    # Emptied in place - the containers themselves are created once, on the main thread
+    st.session_state.llm_cache.clear()
+    st.session_state.result_cache.clear()
+    st.session_state.pop('last_input_key', None)
+    # The disk cache is shared by every session, so rather than deleting files this session
+    # just ignores every entry written before now; fresh responses overwrite them
+    st.session_state.cache_cleared_at = time.time()
+
+# Whole-pipeline results (article after word-count expansion, processed revisions)
+RESULT_CACHE_SIZE = 128
+
+def _result_key(*parts):
+    """Short blake2b key for a pipeline result - cheaper than hashing the full inputs each lookup"""
+    return hashlib.blake2b(json.dumps(parts).encode(), digest_size=16).hexdigest()
+
+def get_cached_result(key):
+    """Look up a pipeline result stored for this session"""
+    return st.session_state.result_cache.get(key)
+
+def store_result(key, value):
+    """Remember a pipeline result, dropping the oldest once the cache is full"""
+    cache = st.session_state.result_cache
+    cache[key] = value
+    if len(cache) > RESULT_CACHE_SIZE:
+        cache.pop(next(iter(cache)))
+
+# -------------- ARTICLE GENERATION WITH RETRY LOGIC ----------------
+def _request_claude(prompt, model=CLAUDE_MODEL, max_tokens=8000, temperature=0.7, static_prefix=None, placeholder=None, history=(), context=None):
+    """Call Claude (the client retries transient errors), streaming into `placeholder` if given"""
+    # `context` is a large block (e.g. the article being revised) sent ahead of the prompt in the
+    # same user turn and marked for prompt caching, so a follow-up call that starts with the same
+    # block reads it from Anthropic's cache. The system prompt alone is well under the model's
+    # minimum cacheable prefix (1,024 tokens for Sonnet), so it is not marked on its own
+    content = prompt
+    if context:
+        content = [
+            {"type": "text", "text": context, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt}
+        ]
+    
+    # `history` holds earlier (role, text) turns that come before the new user prompt
+    request = dict(
+        model=model,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        messages=[{"role": role, "content": text} for role, text in history]
+                 + [{"role": "user", "content": content}]
+    )
+    if static_prefix:
+        # Static instructions go in the system prompt
+        request["system"] = static_prefix
+    
+    try:
+        if placeholder is None:
+            response = anthropic_client.messages.create(**request)
             return response.content[0].text
-        except Exception as e:
-            error_message = str(e)
-            if "529" in error_message or "overloaded" in error_message.lower():
-                if attempt < retry_count - 1:
-                    wait_time = (2 ** attempt) * 5  # 5, 10, 20 seconds
-                    st.warning(f"API overloaded. Waiting {wait_time} seconds before retry...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    st.error("API is overloaded. Please try again in a few minutes.")
-                    return None
-            else:
-                st.error(f"Error calling Claude API: {error_message}")
-                return None
-    return None
+        
+        # Stream so the user sees the article as it is written
+        chunks = []
+        last_render = 0.0
+        with anthropic_client.messages.stream(**request) as stream:
+            for text in stream.text_stream:
+                chunks.append(text)
+                # Throttle redraws - re-rendering on every token floods the browser
+                if time.monotonic() - last_render > 0.25:
+                    placeholder.markdown("".join(chunks))
+                    last_render = time.monotonic()
+            # The SDK assembles the final message itself, so no partial chunk state leaks out
+            return stream.get_final_text()
+    except anthropic.APIStatusError as e:
+        # Only reached once the client's own retries are exhausted
+        if e.status_code == 529 or "overloaded" in str(e).lower():
+            st.error("API is overloaded. Please try again in a few minutes.")
+        else:
+            st.error(f"Error calling Claude API: {e}")
+        return None
+    except anthropic.APIError as e:
+        st.error(f"Error calling Claude API: {e}")
+        return None
+    except Exception as e:
+        # e.g. a connection dropped mid-stream, or a response without a text block
+        st.error(f"Error calling Claude API: {e}")
+        return None
+
+def call_claude(prompt, max_tokens=8000, static_prefix=None, placeholder=None, model=CLAUDE_MODEL, history=(), context=None):
+    """Call Claude, serving identical repeat requests from the response cache"""
+    return cached_call(prompt, model=model, max_tokens=max_tokens, static_prefix=static_prefix,
+                       placeholder=placeholder, history=history, context=context)
+
+# -------------- DOCUMENT SUMMARY ----------------
+# Documents up to this size are embedded verbatim - a summary would be longer and lose exact facts
+DOCUMENT_VERBATIM_CHARS = 2000
+
+def summarize_document(document_content):
+    """Condense an uploaded document into a short brief that every prompt can reuse"""
+    if not document_content:
+        return ""
+    if len(document_content) <= DOCUMENT_VERBATIM_CHARS:
+        return document_content
+    
+    prompt = f'''
+Summarize the following document in no more than 400 words for a blog writer.
+Keep the key facts, figures, findings and arguments. Do not add commentary.
+
+DOCUMENT:
+{document_content[:20000]}'''
+    
+    # Identical documents are served from the response cache
+    summary = cached_call(prompt, model=CLAUDE_FAST_MODEL, max_tokens=800, temperature=0)
+    
+    # Fall back to a raw excerpt if summarisation fails
+    return summary.strip() if summary else document_content[:500]
+
+# -------------- META-TEXT FILTERS ----------------
+def _phrase_re(*phrases):
+    """Compile a case-insensitive substring match for any of the given phrases"""
+    return re.compile('|'.join(map(re.escape, phrases)), re.IGNORECASE)
+
+# Claude's notes about word counts and expansions that must not reach the article
+META_LINE_RE = _phrase_re(
+    'word count:', 'total words:', '[total word', 'additional words', '---expanded',
+    'here\'s an additional', 'to expand the article', 'words to expand'
+)
+# Whole lines (with their newline) that carry word-count notes, plus bare separator lines;
+# stripped from an article in one pass before measuring it
+BLOCK_META_RE = re.compile(
+    r'^(?:.*(?:' + _phrase_re('word count:', 'total words:', '[total word', 'additional words', '---expanded').pattern
+    + r').*|[ \t]*(?:---|___)[ \t]*)(?:\n|\Z)',
+    re.IGNORECASE | re.MULTILINE
+)
+# Lead-ins Claude tends to put in front of expansion paragraphs
+EXPANSION_META_RE = _phrase_re(
+    'additional paragraph', 'additional content', 'here\'s', 'here is',
+    'to expand', 'this adds', 'adding to', 'for the', 'section:',
+    'i\'ll add', 'let me add', 'here are', 'to the section',
+    'building on', 'furthermore to', 'expanding on the'
+)
+# Stricter filter for the final top-up, which tends to be mostly commentary
+TOP_UP_META_RE = _phrase_re(
+    'additional', 'here', 'paragraph', 'section', 'adding',
+    'to expand', 'furthermore to', 'building on'
+)
+# Signs that a revision stopped short instead of returning the whole article
+TRUNCATED_REVISION_RE = _phrase_re(
+    "rest remains", "continue with", "remaining sections",
+    "rest of the article", "continues unchanged", "[remaining",
+    "would continue"
+)
 
 # -------------- ARTICLE REVISION WITH FIXED COMPLETE OUTPUT ----------------
-def revise_article(original_article, revision_request, language="UK", ai_friendly=False):
+def revise_article(original_article, revision_request, language="UK", ai_friendly=False, placeholder=None):
     """Revise article with color-coded output - blue for revised, black for retained"""
+    # Repeating the same revision on the same article skips the whole round trip
+    result_key = _result_key('revision', original_article, revision_request, language, ai_friendly)
+    cached_revision = get_cached_result(result_key)
+    if cached_revision:
+        return cached_revision
+    
     language_instruction = "UK English" if language == "UK" else "US English"
     spelling_examples = "recognise, organisation, realise, optimise, analyse, specialise" if language == "UK" else "recognize, organization, realize, optimize, analyze, specialize"
     
     # Clean the article first
     clean_article = clean_article_for_display(original_article)
-    current_words = len(clean_article.split())
+    current_words = _wc(clean_article)
     
     ai_format_note = ""
     if ai_friendly:
@@ -467,14 +841,15 @@ def revise_article(original_article, revision_request, language="UK", ai_friendl
 - Maintain conversational, scannable style
 """
     
-    # More explicit prompt to ensure complete output
-    prompt = f'''
-I need you to revise a blog article. You MUST output the ENTIRE revised article, not just parts of it.
-
-CURRENT ARTICLE ({current_words} words):
+    # The article goes first in its own block so a retry that repeats it reads it from the prompt cache
+    article_block = f'''CURRENT ARTICLE ({current_words} words):
 =========================================
 {clean_article}
-=========================================
+========================================='''
+    
+    # More explicit prompt to ensure complete output
+    prompt = f'''
+I need you to revise the blog article above. You MUST output the ENTIRE revised article, not just parts of it.
 
 REVISION REQUEST: {revision_request}
 
@@ -510,23 +885,18 @@ This paragraph also unchanged.
 NOW PROVIDE THE COMPLETE REVISED ARTICLE:
 Every paragraph, every section, everything - with [REVISED] tags only around changed parts:'''
     
-    revised_content = call_claude(prompt, max_tokens=8000, retry_count=3)
+    revised_content = call_claude(prompt, max_tokens=8000, placeholder=placeholder, context=article_block)
+    if placeholder is not None:
+        placeholder.empty()
     
     if revised_content:
         # Check if the response seems truncated or incomplete
-        if any(phrase in revised_content.lower() for phrase in [
-            "rest remains", "continue with", "remaining sections", 
-            "rest of the article", "continues unchanged", "[remaining",
-            "would continue"
-        ]):
+        if TRUNCATED_REVISION_RE.search(revised_content):
             # Try again with even more forceful prompt
             prompt2 = f'''
 The previous response was incomplete. I need the COMPLETE article.
 
-Starting from this article:
-{clean_article}
-
-Apply this revision: {revision_request}
+Starting from the article above, apply this revision: {revision_request}
 
 OUTPUT RULES:
 - Write out EVERY SINGLE WORD of the complete article
@@ -537,10 +907,12 @@ OUTPUT RULES:
 
 Output the FULL article now:'''
             
-            revised_content = call_claude(prompt2, max_tokens=8000, retry_count=3)
+            revised_content = call_claude(prompt2, max_tokens=8000, context=article_block)
         
         # Process the content to add HTML color tags
         processed_content = process_revision_colors(revised_content)
+        if processed_content:
+            store_result(result_key, processed_content)
         return processed_content
     
     return None
@@ -556,13 +928,15 @@ def process_revision_colors(content):
     
     return content
 
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
 def strip_html_tags(text):
     """Remove HTML tags from text for clean export"""
     if not text:
         return text
     
     # Remove all HTML tags
-    clean_text = re.sub(r'<[^>]+>', '', text)
+    clean_text = _HTML_TAG_RE.sub('', text)
     return clean_text
 
 # -------------- CLEAN ARTICLE FOR EXPORT ----------------
@@ -578,11 +952,7 @@ def clean_article_for_export(article):
     clean_lines = []
     for line in clean_article.split('\n'):
         # Skip meta-commentary lines
-        if any(x in line.lower() for x in [
-            'word count:', 'total words:', '[total word', 
-            'additional words', '---expanded', 'here\'s an additional',
-            'to expand the article', 'words to expand'
-        ]):
+        if META_LINE_RE.search(line):
             continue
         
         # Skip separator lines
@@ -594,22 +964,14 @@ def clean_article_for_export(article):
     return '\n'.join(clean_lines).strip()
 
 # -------------- WORD COUNT ENFORCER ----------------
-def ensure_word_count(article, min_words, max_words, language="UK", title="", facts="", quotes="", keywords=[], ai_friendly=False, include_hiring_impact=False):
+def ensure_word_count(article, min_words, max_words, language="UK", title="", facts="", quotes="", keywords=[], ai_friendly=False, include_hiring_impact=False, *, original_prompt, static_prompt=None):
     """Completely new approach - never shrink, only expand"""
     if not article:
         return article
     
     # Clean first
-    clean_lines = []
-    for line in article.split('\n'):
-        if any(x in line.lower() for x in ['word count:', 'total words:', '[total word', 'additional words', '---expanded']):
-            continue
-        if line.strip() in ['---', '___', '---EXPANDED CONTENT---']:
-            continue
-        clean_lines.append(line)
-    
-    article = '\n'.join(clean_lines).strip()
-    original_word_count = len(article.split())
+    article = BLOCK_META_RE.sub('', article).strip()
+    original_word_count = _wc(article)
     
     if original_word_count >= min_words:
         return article  # Already good!
@@ -619,43 +981,26 @@ def ensure_word_count(article, min_words, max_words, language="UK", title="", fa
     
     st.warning(f"Article has {original_word_count} words. Need to add {words_needed} more words to reach {min_words} minimum...")
     
-    # DIFFERENT APPROACH: Ask for expansion without meta-text
-    expansion_prompt = f'''
-I need you to write {words_needed} words of additional content that naturally expands on this article about "{title}".
-
-Current article structure:
-{article}
-
----
-
-Write {words_needed} words of additional paragraphs that expand the existing topics.
+    try:
+        # Continue the original conversation: Claude sees the brief and its own draft as earlier
+        # turns, so it extends the article it wrote rather than working from a bare expansion prompt.
+        # Filling out extra paragraphs is mechanical - the fast model handles it at a fraction of the latency
+        continuation_prompt = f'''The article is {words_needed} words short of the {min_words} word minimum.
 
-CRITICAL RULES:
-1. DO NOT include any labels like "Additional paragraph for..." or "Here's more content..."
-2. DO NOT describe where content should go or what section it's for
-3. DO NOT use phrases like "To expand on...", "Building on...", "Furthermore to the section on..."
-4. Just write natural, flowing paragraphs as if they were always part of the article
-5. Each paragraph should be 100-150 words of substantive content
-6. Focus on concrete examples, data, analysis, and insights
-7. Write in {language} English
+Continue it: write {words_needed} more words of natural paragraphs that expand the existing sections with concrete examples, data, analysis and insights, in {language} English.
 
-Output ONLY the new paragraphs with no meta-commentary. Write {words_needed} words now:'''
-    
-    try:
-        additional_content = call_claude(expansion_prompt, max_tokens=4000, retry_count=3)
+Output ONLY the new paragraphs - no labels, headings about where they go, or commentary.'''
+        additional_content = call_claude(
+            continuation_prompt, max_tokens=4000, static_prefix=static_prompt, model=CLAUDE_FAST_MODEL,
+            history=(("user", original_prompt), ("assistant", article))
+        )
         
         if additional_content:
             # Aggressive cleaning of any meta-text that slipped through
             clean_additions = []
             for line in additional_content.split('\n'):
                 # Skip lines that are clearly meta-text
-                line_lower = line.lower()
-                if any(phrase in line_lower for phrase in [
-                    'additional paragraph', 'additional content', 'here\'s', 'here is',
-                    'to expand', 'this adds', 'adding to', 'for the', 'section:',
-                    'i\'ll add', 'let me add', 'here are', 'to the section',
-                    'building on', 'furthermore to', 'expanding on the'
-                ]):
+                if EXPANSION_META_RE.search(line):
                     continue
                 # Also skip if line starts with common meta-text patterns
                 if line.strip().endswith(':') and len(line.strip()) < 50:
@@ -666,7 +1011,7 @@ Output ONLY the new paragraphs with no meta-commentary. Write {words_needed} wor
             
             # Combine original + additions
             expanded_article = article + "\n\n" + additional_content
-            new_word_count = len(expanded_article.split())
+            new_word_count = _wc(expanded_article)
             
             if new_word_count >= min_words:
                 st.success(f"Successfully expanded article from {original_word_count} to {new_word_count} words!")
@@ -685,22 +1030,19 @@ DO NOT write any introductory text, labels, or descriptions.
 DO NOT say what section this is for.
 Just write {still_needed} words of content:'''
                 
-                more_content = call_claude(more_content_prompt, max_tokens=2000, retry_count=3)
+                more_content = call_claude(more_content_prompt, max_tokens=2000, model=CLAUDE_FAST_MODEL)
                 
                 if more_content:
                     # Clean again
                     clean_more = []
                     for line in more_content.split('\n'):
-                        if not any(phrase in line.lower() for phrase in [
-                            'additional', 'here', 'paragraph', 'section', 'adding',
-                            'to expand', 'furthermore to', 'building on'
-                        ]):
+                        if not TOP_UP_META_RE.search(line):
                             clean_more.append(line)
                     
                     more_content = '\n'.join(clean_more).strip()
                     
                     final_article = expanded_article + "\n\n" + more_content
-                    final_count = len(final_article.split())
+                    final_count = _wc(final_article)
                     
                     if final_count >= min_words:
                         st.success(f"Final expansion successful: {final_count} words!")
@@ -715,7 +1057,55 @@ Just write {still_needed} words of content:'''
     
     return article
 
+# -------------- ARTICLE PIPELINE ----------------
+def generate_article(static_prompt, full_prompt, language, min_words, max_words, placeholder=None, **word_count_options):
+    """Generate one language version, reusing the finished article when the inputs are unchanged"""
+    result_key = _result_key('article', static_prompt, full_prompt, min_words, max_words)
+    article = get_cached_result(result_key)
+    if article:
+        return article
+    
+    # Show the article as it streams in, then clear it for the final preview
+    article = call_claude(full_prompt, static_prefix=static_prompt, placeholder=placeholder)
+    if placeholder is not None:
+        placeholder.empty()
+    
+    if article:
+        # Ensure word count is met
+        article = ensure_word_count(article, min_words, max_words, language,
+                                    static_prompt=static_prompt, original_prompt=full_prompt,
+                                    **word_count_options)
+        # A short article means the expansion failed - leave it uncached so the next run retries it
+        if _wc(article) >= min_words:
+            store_result(result_key, article)
+    return article
+
+def run_in_parallel(func, items):
+    """Map func over items on worker threads that can still write to the current page"""
+    # A single item (e.g. only one language selected) gains nothing from a pool - run it inline
+    if len(items) < 2:
+        return [func(item) for item in items]
+    
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=len(items),
+                            initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)) as executor:
+        return list(executor.map(func, items))
+
 # -------------- CLEAN ARTICLE DISPLAY ----------------
+_WORD_RE = re.compile(r'\S+')
+
+def _wc(text):
+    """Count words without building the intermediate list that split() creates"""
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+def _split_title(article):
+    """Split a leading "TITLE:" line off an article, returning (title or None, body)"""
+    # partition only scans to the first newline
+    first_line, _, body = article.partition('\n')
+    if not first_line.startswith("TITLE:"):
+        return None, article
+    return first_line[len("TITLE:"):].strip(), body
+
 def clean_article_for_display(article):
     """Remove any meta-text from article before displaying"""
     clean_lines = []
@@ -723,11 +1113,7 @@ def clean_article_for_display(article):
     
     for line in article.split('\n'):
         # Skip meta-commentary lines
-        if any(x in line.lower() for x in [
-            'word count:', 'total words:', '[total word', 
-            'additional words', '---expanded', 'here\'s an additional',
-            'to expand the article', 'words to expand'
-        ]):
+        if META_LINE_RE.search(line):
             skip_next = True
             continue
         
@@ -745,16 +1131,34 @@ def clean_article_for_display(article):
     
     return '\n'.join(clean_lines).strip()
 
+def _display_entry(article):
+    """Precompute the preview text, word count and generated title for one article"""
+    title, article = _split_title(article)
+    
+    # Revised articles carry colour spans, so render them as HTML and count words without the tags
+    if '<span style="color:' in article:
+        return {'text': article, 'html': True, 'wc': _wc(strip_html_tags(article)), 'title': title}
+    
+    text = clean_article_for_display(article)
+    return {'text': text, 'html': False, 'wc': _wc(text), 'title': title}
+
+def refresh_display_cache(*locales):
+    """Rebuild the preview cache (or just the given locales); call whenever current_articles changes"""
+    articles = st.session_state.current_articles
+    if locales:
+        for loc in locales:
+            st.session_state.display_cache[loc] = _display_entry(articles[loc])
+        return
+    st.session_state.display_cache = {loc: _display_entry(article) for loc, article in articles.items()}
+
 # -------------- PROCESS BOLD TEXT ----------------
+# Find all bold sections
+_BOLD_RE = re.compile(r'\*\*([^*]+)\*\*')
+
 def process_bold_text(paragraph, p):
     """Process markdown bold text (**text**) in a paragraph for DOCX"""
-    import re
-    
-    # Find all bold sections
-    bold_pattern = r'\*\*([^*]+)\*\*'
-    
     # Split the text by bold markers
-    parts = re.split(bold_pattern, paragraph)
+    parts = _BOLD_RE.split(paragraph)
     
     # Clear the paragraph first
     p.clear()
@@ -773,207 +1177,239 @@ def process_bold_text(paragraph, p):
     return p
 
 # -------------- CONVERT MARKDOWN TO DOCX ----------------
+# Either "# Heading" to "### Heading" (optionally wrapped in ** bold markers), or a line that is
+# entirely bold (e.g. **Understanding the Market**), which is treated as a level 2 heading
+_HEADING_RE = re.compile(
+    r'^(?:\*{0,2}(?P<hashes>#{1,3})\s+(?P<text>.+)'
+    r'|\*\*(?P<bold>[^*]+)\*\*)$'
+)
+
+def _detached_paragraph(doc, style_id=None):
+    """Create a <w:p> that is not yet in the body, wrapped so runs can be added to it"""
+    from docx.oxml import OxmlElement
+    from docx.text.paragraph import Paragraph
+    
+    p = OxmlElement('w:p')
+    if style_id:
+        p.get_or_add_pPr().style = style_id
+    return Paragraph(p, doc)
+
+def _insert_body_elements(doc, elements):
+    """Append detached elements to the body in one slice assignment"""
+    # Body content has to stay ahead of the trailing section properties
+    body = doc.element.body
+    insert_at = body.index(body.sectPr) if body.sectPr is not None else len(body)
+    body[insert_at:insert_at] = elements
+
 def markdown_to_docx(content, title):
     """Convert markdown content to DOCX format with proper bold text processing"""
+    from docx import Document
+    
     doc = Document()
     
     # Add title (without language marker)
     doc.add_heading(title, 0)
     
-    # Process the content line by line
-    lines = content.split('\n')
+    # Paragraphs are built detached and inserted into the body in one go at the end,
+    # rather than appended (and their styles looked up) one add_paragraph call at a time
+    elements = []
     current_paragraph = []
     
-    for line in lines:
+    def flush_paragraph():
+        # Add accumulated paragraph lines as a single paragraph
+        if current_paragraph:
+            paragraph = _detached_paragraph(doc)
+            process_bold_text(' '.join(current_paragraph), paragraph)
+            elements.append(paragraph._p)
+            current_paragraph.clear()
+    
+    for line in content.splitlines():
         line = line.strip()
         
         # Skip lines that are just "TITLE:" markers if present
         if line.startswith("TITLE:"):
             continue
-            
+        
         if not line:
-            # Empty line - add accumulated paragraph if any
-            if current_paragraph:
-                p = doc.add_paragraph()
-                paragraph_text = ' '.join(current_paragraph)
-                process_bold_text(paragraph_text, p)
-                current_paragraph = []
+            flush_paragraph()
             continue
         
-        # Check for headings with bold markers
-        if line.startswith('**') and line.endswith('**') and not line[2:-2].strip().startswith('*'):
-            if current_paragraph:
-                p = doc.add_paragraph()
-                paragraph_text = ' '.join(current_paragraph)
-                process_bold_text(paragraph_text, p)
-                current_paragraph = []
-            
-            # Extract heading text and level
-            heading_text = line.strip('*').strip()
-            
-            # Determine heading level based on markers
-            if heading_text.startswith('### '):
-                heading_text = heading_text[4:]
-                h = doc.add_heading(heading_text, level=3)
-            elif heading_text.startswith('## '):
-                heading_text = heading_text[3:]
-                h = doc.add_heading(heading_text, level=2)
-            elif heading_text.startswith('# '):
-                heading_text = heading_text[2:]
-                h = doc.add_heading(heading_text, level=1)
-            else:
-                # Default to level 2 for bold lines that look like headings
-                h = doc.add_heading(heading_text, level=2)
-            
-            h.runs[0].bold = True
-        # Also check for headings without bold markers (fallback)
-        elif line.startswith('### '):
-            if current_paragraph:
-                p = doc.add_paragraph()
-                paragraph_text = ' '.join(current_paragraph)
-                process_bold_text(paragraph_text, p)
-                current_paragraph = []
-            h = doc.add_heading(line[4:], level=3)
-            h.runs[0].bold = True
-        elif line.startswith('## '):
-            if current_paragraph:
-                p = doc.add_paragraph()
-                paragraph_text = ' '.join(current_paragraph)
-                process_bold_text(paragraph_text, p)
-                current_paragraph = []
-            h = doc.add_heading(line[3:], level=2)
-            h.runs[0].bold = True
-        elif line.startswith('# '):
-            if current_paragraph:
-                p = doc.add_paragraph()
-                paragraph_text = ' '.join(current_paragraph)
-                process_bold_text(paragraph_text, p)
-                current_paragraph = []
-            h = doc.add_heading(line[2:], level=1)
-            h.runs[0].bold = True
+        match = _HEADING_RE.match(line)
+        heading_text = ""
+        if match and match['hashes']:
+            level = len(match['hashes'])
+            # The whole heading run is bold, so drop inline ** pairs as well as any wrapping markers
+            heading_text = _BOLD_RE.sub(r'\1', match['text']).strip('* ')
+        elif match:
+            level = 2
+            heading_text = match['bold'].strip()
+        
+        if heading_text:
+            flush_paragraph()
+            heading = _detached_paragraph(doc, f"Heading{level}")
+            heading.add_run(heading_text).bold = True
+            elements.append(heading._p)
         else:
             # Regular text - accumulate
             current_paragraph.append(line)
     
     # Add any remaining paragraph
-    if current_paragraph:
-        p = doc.add_paragraph()
-        paragraph_text = ' '.join(current_paragraph)
-        process_bold_text(paragraph_text, p)
+    flush_paragraph()
+    
+    _insert_body_elements(doc, elements)
     
     return doc
 
 # -------------- EXPORT TO DOCX ----------------
-def export_docx(title, article_uk, article_us, keywords, document_analysis=""):
+def _build_export_doc(article, title, keywords_str, logo=None):
+    """Build the DOCX for one language version; returns the document and any generated title"""
+    from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+    from docx.shared import Pt
+    
+    # Clean article for export (removes HTML tags)
+    article = clean_article_for_export(article)
+    
+    # Extract generated title if present
+    generated_title, article = _split_title(article)
+    
+    doc = markdown_to_docx(article, generated_title or title)
+    
+    # Add logo if available
+    if logo:
+        # Add a paragraph for the logo at the beginning
+        first_paragraph = doc.paragraphs[0]
+        logo_paragraph = first_paragraph.insert_paragraph_before()
+        logo_paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        
+        # python-docx reads the picture straight from the in-memory PNG
+        logo_run = logo_paragraph.add_run()
+        logo_run.add_picture(io.BytesIO(logo), width=Pt(150))
+        
+        # Add some spacing after logo
+        doc.add_paragraph("")
+    
+    _append_footer(doc, _wc(article), keywords_str)
+    
+    return doc, generated_title
+
+def _append_footer(doc, word_count, keywords_str):
+    """Add the minimal metadata block at the end of the document in a single insertion"""
+    lines = ("", "---", f"Word Count: {word_count}", f"Keywords: {keywords_str}")
+    footer = []
+    for text in lines:
+        paragraph = _detached_paragraph(doc)
+        if text:
+            paragraph.add_run(text)
+        footer.append(paragraph._p)
+    _insert_body_elements(doc, footer)
+
+def _export_filename(title, language):
+    """Timestamped download name for one language version"""
     timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
     safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
     safe_title = safe_title.replace(' ', '_')
-    
-    os.makedirs("exports", exist_ok=True)
+    return f"{safe_title}_{language}_{timestamp}.docx"
+
+def export_docx(title, article_uk, article_us, keywords_str, logo=None):
+    """Build the DOCX files in memory; returns (download filenames, title, bytes per language)"""
     filenames = {}
+    docx_bytes = {}
+    to_save = []
     
     # Extract actual title if it was generated
     actual_title = title
     
-    # Create UK version
-    if article_uk:
-        # Clean article for export (removes HTML tags)
-        article_uk = clean_article_for_export(article_uk)
-        
-        # Extract generated title if present
-        if "TITLE:" in article_uk:
-            title_line = article_uk.split('\n')[0]
-            if title_line.startswith("TITLE:"):
-                actual_title = title_line.replace("TITLE:", "").strip()
-                article_uk = '\n'.join(article_uk.split('\n')[1:])  # Remove title line from content
-        
-        doc_uk = markdown_to_docx(article_uk, actual_title)
-        
-        # Add logo if available
-        if 'logo_bytes' in st.session_state:
-            # Add a paragraph for the logo at the beginning
-            first_paragraph = doc_uk.paragraphs[0]
-            logo_paragraph = first_paragraph.insert_paragraph_before()
-            logo_paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            
-            # Save logo temporarily and add to document
-            temp_logo_path = "temp_logo.png"
-            with open(temp_logo_path, 'wb') as f:
-                st.session_state.logo_bytes.seek(0)
-                f.write(st.session_state.logo_bytes.read())
-            
-            logo_run = logo_paragraph.add_run()
-            logo_run.add_picture(temp_logo_path, width=Pt(150))
-            
-            # Clean up temp file
-            os.remove(temp_logo_path)
-            
-            # Add some spacing after logo
-            doc_uk.add_paragraph("")
-        
-        # Add minimal metadata at the end
-        doc_uk.add_paragraph("")
-        doc_uk.add_paragraph("---")
-        doc_uk.add_paragraph(f"Word Count: {len(article_uk.split())}")
-        doc_uk.add_paragraph(f"Keywords: {', '.join(keywords)}")
-        
-        filename_uk = f"exports/{safe_title}_UK_{timestamp}.docx"
-        doc_uk.save(filename_uk)
-        filenames['UK'] = filename_uk
-    
-    # Create US version
-    if article_us:
-        # Clean article for export (removes HTML tags)
-        article_us = clean_article_for_export(article_us)
-        
-        # Extract generated title if present
-        if "TITLE:" in article_us:
-            title_line = article_us.split('\n')[0]
-            if title_line.startswith("TITLE:"):
-                actual_title = title_line.replace("TITLE:", "").strip()
-                article_us = '\n'.join(article_us.split('\n')[1:])  # Remove title line from content
-        
-        doc_us = markdown_to_docx(article_us, actual_title)
-        
-        # Add logo if available
-        if 'logo_bytes' in st.session_state:
-            # Add a paragraph for the logo at the beginning
-            first_paragraph = doc_us.paragraphs[0]
-            logo_paragraph = first_paragraph.insert_paragraph_before()
-            logo_paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            
-            # Save logo temporarily and add to document
-            temp_logo_path = "temp_logo.png"
-            with open(temp_logo_path, 'wb') as f:
-                st.session_state.logo_bytes.seek(0)
-                f.write(st.session_state.logo_bytes.read())
-            
-            logo_run = logo_paragraph.add_run()
-            logo_run.add_picture(temp_logo_path, width=Pt(150))
-            
-            # Clean up temp file
-            os.remove(temp_logo_path)
-            
-            # Add some spacing after logo
-            doc_us.add_paragraph("")
-        
-        # Add minimal metadata at the end
-        doc_us.add_paragraph("")
-        doc_us.add_paragraph("---")
-        doc_us.add_paragraph(f"Word Count: {len(article_us.split())}")
-        doc_us.add_paragraph(f"Keywords: {', '.join(keywords)}")
-        
-        filename_us = f"exports/{safe_title}_US_{timestamp}.docx"
-        doc_us.save(filename_us)
-        filenames['US'] = filename_us
+    for language, article in (('UK', article_uk), ('US', article_us)):
+        if not article:
+            continue
+        doc, generated_title = _build_export_doc(article, title, keywords_str, logo)
+        if generated_title:
+            actual_title = generated_title
+        filenames[language] = _export_filename(title, language)
+        to_save.append((language, doc))
+    
+    def save_to_bytes(item):
+        # Save into memory - nothing touches the server's filesystem
+        language, doc = item
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return language, buffer.getvalue()
+    
+    # Saving is dominated by zip compression, which releases the GIL, so save both versions in parallel
+    if len(to_save) > 1:
+        with ThreadPoolExecutor(max_workers=len(to_save)) as executor:
+            docx_bytes = dict(executor.map(save_to_bytes, to_save))
+    else:
+        docx_bytes = dict(map(save_to_bytes, to_save))
+    
+    return filenames, actual_title, docx_bytes
+
+def get_export_files(title, articles, keywords_str):
+    """Describe the DOCX downloads; each file is built on its first download and kept in session state"""
+    logo = st.session_state.get('logo_bytes')
+    logo = logo.getvalue() if logo else None
+    logo_digest = hashlib.blake2b(logo, digest_size=16).hexdigest() if logo else ""
+    exports = st.session_state.setdefault('docx_exports', {})
+    articles = {loc: article for loc, article in articles.items() if article}
+    keys = {
+        loc: _result_key('export', loc, title, article, keywords_str, logo_digest)
+        for loc, article in articles.items()
+    }
+    
+    # Only versions whose content changed (e.g. the one just revised) get a fresh, unbuilt entry
+    for loc, key in keys.items():
+        if exports.get(loc, {}).get('key') != key:
+            exports[loc] = {'key': key, 'filename': _export_filename(title, loc), 'bytes': None}
+    entries = {loc: exports[loc] for loc in keys}
+    
+    def build(locales):
+        # Called by the download buttons on click, on a thread outside the script run, so it
+        # only works with the values captured above - a later rerun can't swap them underneath
+        stale = [loc for loc in locales if entries[loc]['bytes'] is None]
+        if stale:
+            _, _, docx_bytes = export_docx(
+                title,
+                articles['UK'] if 'UK' in stale else '',
+                articles['US'] if 'US' in stale else '',
+                keywords_str,
+                logo
+            )
+            for loc in stale:
+                entries[loc]['bytes'] = docx_bytes[loc]
+        return [entries[loc]['bytes'] for loc in locales]
     
-    return filenames, actual_title
+    def build_one(loc):
+        return build([loc])[0]
+    
+    downloads = [
+        {'loc': loc, 'name': entry['filename'], 'data': functools.partial(build_one, loc)}
+        for loc, entry in entries.items()
+    ]
+    
+    # Bundle both versions into one archive; .docx is already compressed, so use the cheapest level
+    zip_key = tuple(keys.values())
+    if exports.get('zip', {}).get('key') != zip_key:
+        exports['zip'] = {'key': zip_key, 'bytes': None}
+    zip_entry = exports['zip']
+    
+    def _build_zip():
+        if zip_entry['bytes'] is None:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+                for entry, data in zip(entries.values(), build(list(entries))):
+                    zf.writestr(entry['filename'], data)
+            zip_entry['bytes'] = buffer.getvalue()
+        return zip_entry['bytes']
+    
+    return downloads, _build_zip if len(entries) > 1 else None
 
 # Initialize session state
 if 'blog_history' not in st.session_state:
-    st.session_state.blog_history = []
+    st.session_state.blog_history = collections.deque(maxlen=10)
 if 'current_articles' not in st.session_state:
     st.session_state.current_articles = {}
+if 'display_cache' not in st.session_state:
+    st.session_state.display_cache = {}
 if 'editing_mode' not in st.session_state:
     st.session_state.editing_mode = False
 if 'use_generated_title' not in st.session_state:
@@ -982,9 +1418,15 @@ if 'generated_title' not in st.session_state:
     st.session_state.generated_title = ""
 if 'title_generation_count' not in st.session_state:
     st.session_state.title_generation_count = 0
-
-# Professional CSS styling
-st.markdown("""
+# Caches that generation worker threads write into. They are created here, on the main thread,
+# because two workers creating them at once would each get their own dict and lose entries
+if 'llm_cache' not in st.session_state:
+    st.session_state.llm_cache = {}
+if 'result_cache' not in st.session_state:
+    st.session_state.result_cache = {}
+
+# Professional CSS styling - a plain constant, so the literal lives in the compiled module
+_STATIC_CSS = """
 <style>
     .main-header {
         background: linear-gradient(135deg, #2c3e50 0%, #34495e 100%);
@@ -1112,15 +1554,35 @@ st.markdown("""
         margin: 0.5rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-# Header
-st.markdown("""
+# Static page fragments
+_HEADER_HTML = """
 <div class="main-header">
     <h1>Hi, I am "AI-van"!</h1>
     <p>The Marketing Junction's advanced AI-powered blog writing tool based on the human inputs and approaches of Evan.</p>
 </div>
-""", unsafe_allow_html=True)
+"""
+
+_SUCCESS_HTML = """
+<div class="success-message">
+    <h4>Blog articles ready!</h4>
+    <p>Review your content below. You can request revisions before downloading.</p>
+</div>
+"""
+
+_FOOTER_HTML = """
+<div style="text-align: center; padding: 2rem; color: #6c757d; font-size: 0.9rem;">
+    <p>Powered by Claude AI | Enhanced Blog Writing Tool | The Marketing Junction</p>
+</div>
+"""
+
+# Emitted on every run - Streamlit drops elements a run doesn't re-emit, so injecting it once
+# behind a session flag would leave the page unstyled from the second rerun onwards
+st.markdown(_STATIC_CSS, unsafe_allow_html=True)
+
+# Header
+st.markdown(_HEADER_HTML, unsafe_allow_html=True)
 
 # Sidebar for configuration
 with st.sidebar:
@@ -1198,15 +1660,19 @@ with st.sidebar:
         help="Choose export format for generated content"
     )
     
+    # Identical requests are answered from the response cache; this forces fresh generations for this session
+    if st.button("🧹 Clear generation cache", help="Regenerate from Claude instead of reusing cached responses"):
+        clear_generation_cache()
+        st.success("Generation cache cleared")
+    
     # Blog History
     st.markdown("### Blog History")
     if st.session_state.blog_history:
         st.markdown("<small>Click to view previous blogs:</small>", unsafe_allow_html=True)
-        for entry in st.session_state.blog_history[:5]:  # Show last 5
-            if st.button(f"📄 {entry['title'][:30]}...", key=f"history_{entry['id']}"):
-                st.session_state.current_articles = entry['articles']
-                st.session_state.loaded_from_history = True
-                st.rerun()
+        for entry in itertools.islice(st.session_state.blog_history, 5):  # Show last 5
+            # The callback updates state before the rerun, so no second st.rerun() is needed
+            st.button(f"📄 {entry['title'][:30]}...", key=f"history_{entry['id']}",
+                      on_click=load_history_entry, args=(entry,))
     else:
         st.info("No history yet. Generate your first blog!")
 
@@ -1309,10 +1775,20 @@ with col1:
             type=['pdf', 'docx', 'txt', 'csv', 'xlsx', 'xls'],
             help="Upload a document that Claude will analyze and use as supporting material"
         )
+        include_data_stats = st.checkbox(
+            "Include numeric statistics for spreadsheets",
+            value=True,
+            help="Summarise numeric columns of CSV/Excel uploads. Turn off for very large files to only read a preview."
+        )
         
+        # Read the upload once and pass the bytes around from here on
+        uploaded_bytes = b""
+        uploaded_extension = ""
         if uploaded_file:
+            uploaded_bytes = uploaded_file.getvalue()
+            uploaded_extension = uploaded_file.name.split('.')[-1].lower()
             st.success(f"File uploaded: {uploaded_file.name}")
-            file_size = len(uploaded_file.getvalue()) / 1024  # KB
+            file_size = len(uploaded_bytes) / 1024  # KB
             st.info(f"File size: {file_size:.1f} KB")
         
         # Submit button
@@ -1354,21 +1830,35 @@ with col2:
 # -------------- MAIN EXECUTION ----------------
 # Handle title generation and blog generation
 if submitted and (blog_title or (st.session_state.use_generated_title and st.session_state.generated_title)):
+    # Use generated title if checkbox is checked
+    if st.session_state.use_generated_title and st.session_state.generated_title:
+        blog_title = st.session_state.generated_title
+    
+    # Fingerprint every generation input so an accidental resubmit doesn't rerun the pipeline
+    upload_digest = hashlib.blake2b(uploaded_bytes, digest_size=16).hexdigest() if uploaded_bytes else ""
+    input_key = _result_key(
+        'inputs', client_name, blog_title, pasted_facts, pasted_quotes, ai_friendly, extra_keywords,
+        upload_digest, include_data_stats, word_count_range, include_hiring_section, generate_uk, generate_us
+    )
+    
     if not (generate_uk or generate_us):
         st.error("Please select at least one language version to generate.")
+    elif input_key == st.session_state.get('last_input_key') and st.session_state.current_articles:
+        st.info("Nothing has changed since the last generation - the articles below are up to date.")
     else:
-        # Use generated title if checkbox is checked
-        if st.session_state.use_generated_title and st.session_state.generated_title:
-            blog_title = st.session_state.generated_title
-        
         client_cfg = load_client_config(client_name)
         
         # Process uploaded file
         document_content = ""
-        if uploaded_file:
+        document_brief = ""
+        if uploaded_bytes:
             with st.spinner("Analyzing uploaded document..."):
-                document_content = process_uploaded_file(uploaded_file)
+                document_content = process_uploaded_bytes(uploaded_bytes, uploaded_extension, include_data_stats)
                 st.session_state.generation_stats['files_processed'] += 1
+            # Prompts embed a short summary instead of re-sending the raw document each time
+            if document_content:
+                with st.spinner("Summarising document..."):
+                    document_brief = summarize_document(document_content)
         
         # Show document analysis if requested
         if show_analysis and document_content:
@@ -1378,72 +1868,63 @@ if submitted and (blog_title or (st.session_state.use_generated_title and st.ses
         
         articles = {}
         
-        # Debug: Show what word count is being sent
-        try:
-            min_words_debug, max_words_debug = map(int, word_count_range.split('-'))
-        except:
-            min_words_debug, max_words_debug = 750, 1500
+        # Parse the word range once per submission; everything downstream reads the ints
+        st.session_state.word_bounds = parse_word_range(word_count_range)
+        min_words, max_words = st.session_state.word_bounds
         
-        st.info(f"📊 Target: {max_words_debug} words (minimum {min_words_debug})")
+        st.info(f"📊 Target: {max_words} words (minimum {min_words})")
         
-        # Generate UK version
-        if generate_uk:
-            with st.spinner("Generating UK English version..."):
-                full_prompt, all_keywords = generate_prompt(
-                    blog_title, pasted_facts, pasted_quotes, ai_friendly, 
-                    client_cfg, extra_keywords, document_content, "UK", word_count_range, 
-                    include_hiring_section, generate_title=False
-                )
-                
-                # Debug: Show part of the prompt to verify word count instructions
-                if show_prompt_debug:
-                    with st.expander("UK Prompt Debug Info", expanded=True):
-                        st.text_area("First 1000 chars of UK prompt:", full_prompt[:1000], height=200)
-                        st.info(f"Full prompt length: {len(full_prompt)} characters")
-                
-                article_uk = call_claude(full_prompt)
-                if article_uk:
-                    # Ensure word count is met - passing title now
-                    article_uk = ensure_word_count(article_uk, min_words_debug, max_words_debug, "UK", 
-                                                  title=blog_title, facts=pasted_facts, quotes=pasted_quotes,
-                                                  keywords=all_keywords, ai_friendly=ai_friendly,
-                                                  include_hiring_impact=include_hiring_section)
-                    articles['UK'] = article_uk
+        # Build every prompt up front so the debug info renders before generation starts
+        locales = [loc for loc, selected in (("UK", generate_uk), ("US", generate_us)) if selected]
+        prompts = {}
+        for loc in locales:
+            static_prompt, full_prompt, all_keywords = generate_prompt(
+                blog_title, pasted_facts, pasted_quotes, ai_friendly, 
+                client_cfg, extra_keywords, document_brief, loc, st.session_state.word_bounds, 
+                include_hiring_section, generate_title=False
+            )
+            prompts[loc] = (static_prompt, full_prompt)
+            
+            # Debug: Show part of the prompt to verify word count instructions
+            if show_prompt_debug:
+                with st.expander(f"{loc} Prompt Debug Info", expanded=True):
+                    st.text_area(f"First 1000 chars of {loc} prompt:", (static_prompt + full_prompt)[:1000], height=200)
+                    st.info(f"Full prompt length: {len(static_prompt) + len(full_prompt)} characters")
         
-        # Generate US version
-        if generate_us:
-            with st.spinner("Generating US English version..."):
-                full_prompt, all_keywords = generate_prompt(
-                    blog_title, pasted_facts, pasted_quotes, ai_friendly, 
-                    client_cfg, extra_keywords, document_content, "US", word_count_range, 
-                    include_hiring_section, generate_title=False
-                )
-                
-                # Debug: Show part of the prompt to verify word count instructions
-                if show_prompt_debug:
-                    with st.expander("US Prompt Debug Info", expanded=True):
-                        st.text_area("First 1000 chars of US prompt:", full_prompt[:1000], height=200)
-                        st.info(f"Full prompt length: {len(full_prompt)} characters")
-                
-                article_us = call_claude(full_prompt)
-                if article_us:
-                    # Ensure word count is met - passing title now
-                    article_us = ensure_word_count(article_us, min_words_debug, max_words_debug, "US",
-                                                  title=blog_title, facts=pasted_facts, quotes=pasted_quotes,
-                                                  keywords=all_keywords, ai_friendly=ai_friendly,
-                                                  include_hiring_impact=include_hiring_section)
-                    articles['US'] = article_us
+        def generate_locale(job):
+            loc, placeholder = job
+            static_prompt, full_prompt = prompts[loc]
+            return loc, generate_article(
+                static_prompt, full_prompt, loc, min_words, max_words, placeholder,
+                title=blog_title, facts=pasted_facts, quotes=pasted_quotes,
+                keywords=all_keywords, ai_friendly=ai_friendly,
+                include_hiring_impact=include_hiring_section
+            )
+        
+        # UK and US are independent, network-bound calls, so generate them concurrently
+        with st.spinner(f"Generating {' & '.join(locales)} English version{'s' if len(locales) > 1 else ''}..."):
+            # Each version streams into its own placeholder
+            jobs = [(loc, st.empty()) for loc in locales]
+            for loc, article in run_in_parallel(generate_locale, jobs):
+                if article:
+                    articles[loc] = article
         
         if articles:
             # Save to session state and history
             st.session_state.current_articles = articles
+            refresh_display_cache()
             st.session_state.current_keywords = all_keywords
+            st.session_state.current_keywords_str = ', '.join(all_keywords)
             st.session_state.current_title = blog_title
             st.session_state.document_content = document_content
+            # Only a complete run counts, so a failed or short version can still be retried with the same inputs
+            complete = len(articles) == len(locales) and all(_wc(article) >= min_words for article in articles.values())
+            st.session_state.last_input_key = input_key if complete else None
             
             # Update stats
             st.session_state.generation_stats['total_blogs'] += len(articles)
-            total_words = sum(len(clean_article_for_display(article).split()) for article in articles.values())
+            # Reuse the word counts the display cache has just computed
+            total_words = sum(entry['wc'] for entry in st.session_state.display_cache.values())
             st.session_state.generation_stats['total_words'] += total_words
             
             # Save to history
@@ -1453,19 +1934,8 @@ if submitted and (blog_title or (st.session_state.use_generated_title and st.ses
 elif submitted:
     st.warning("Please enter a blog title before generating articles.")
 
-# Display generated articles or loaded from history
-if st.session_state.current_articles:
-    articles = st.session_state.current_articles
-    
-    # Success message
-    st.markdown("""
-    <div class="success-message">
-        <h4>Blog articles ready!</h4>
-        <p>Review your content below. You can request revisions before downloading.</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Revision section
+def _revision_panel(articles):
+    """Revision request box and per-version revise buttons (rendered inside show_articles)"""
     st.markdown("### Request Revisions")
     with st.container():
         revision_request = st.text_area(
@@ -1480,156 +1950,95 @@ if st.session_state.current_articles:
             with col1:
                 if 'UK' in articles and st.button("Revise UK Version", type="secondary"):
                     with st.spinner("Revising UK version..."):
-                        revised_uk = revise_article(articles['UK'], revision_request, "UK", ai_friendly)
+                        revised_uk = revise_article(articles['UK'], revision_request, "UK", ai_friendly, st.empty())
                         if revised_uk:
                             st.session_state.current_articles['UK'] = revised_uk
+                            st.session_state.pop('last_input_key', None)
+                            refresh_display_cache('UK')
                             st.success("UK version revised!")
-                            st.rerun()
             
             with col2:
                 if 'US' in articles and st.button("Revise US Version", type="secondary"):
                     with st.spinner("Revising US version..."):
-                        revised_us = revise_article(articles['US'], revision_request, "US", ai_friendly)
+                        revised_us = revise_article(articles['US'], revision_request, "US", ai_friendly, st.empty())
                         if revised_us:
                             st.session_state.current_articles['US'] = revised_us
+                            st.session_state.pop('last_input_key', None)
+                            refresh_display_cache('US')
                             st.success("US version revised!")
-                            st.rerun()
+
+# Display generated articles or loaded from history
+@st.fragment
+def show_articles():
+    """Revision, download and preview panel; interactions here rerun only this fragment"""
+    if not st.session_state.current_articles:
+        return
+    
+    articles = st.session_state.current_articles
+    
+    # Success message
+    st.markdown(_SUCCESS_HTML, unsafe_allow_html=True)
+    
+    # Revisions update current_articles in place before the downloads and preview below
+    # render, so they show the new text in this same fragment run without another rerun
+    _revision_panel(articles)
     
     st.markdown("---")
     
     # Export files for download
-    filenames, extracted_title = export_docx(
+    downloads, build_zip = get_export_files(
         st.session_state.get('current_title', 'Blog Article'),
-        articles.get('UK', ''),
-        articles.get('US', ''),
-        st.session_state.get('current_keywords', []),
-        st.session_state.get('document_content', '')
+        articles,
+        st.session_state.get('current_keywords_str', '')
     )
     
-    # Download buttons
+    # Download buttons - Streamlit calls the data functions only when a button is clicked
     st.markdown("### Download Final Articles")
-    download_col1, download_col2 = st.columns(2)
-    
-    with download_col1:
-        if 'UK' in articles and 'UK' in filenames:
-            with open(filenames['UK'], "rb") as file:
-                st.download_button(
-                    "📥 Download UK Version",
-                    data=file.read(),
-                    file_name=os.path.basename(filenames['UK']),
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                )
-    
-    with download_col2:
-        if 'US' in articles and 'US' in filenames:
-            with open(filenames['US'], "rb") as file:
-                st.download_button(
-                    "📥 Download US Version",
-                    data=file.read(),
-                    file_name=os.path.basename(filenames['US']),
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                )
+    for column, download in zip(st.columns(2), downloads):
+        with column:
+            st.download_button(
+                f"📥 Download {download['loc']} Version",
+                data=download['data'],
+                file_name=download['name'],
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            )
+    
+    if build_zip:
+        st.download_button(
+            "📥 Download Both (ZIP)",
+            data=build_zip,
+            file_name="blog_articles.zip",
+            mime="application/zip"
+        )
     
     # Preview sections
     st.markdown("---")
     st.markdown("### Article Preview")
     
-    # Extract and display generated title if present
-    display_title = st.session_state.get('current_title', 'Blog Article')
-    if articles:
-        first_article = list(articles.values())[0]
-        if "TITLE:" in first_article:
-            title_line = first_article.split('\n')[0]
-            if title_line.startswith("TITLE:"):
-                display_title = title_line.replace("TITLE:", "").strip()
-                st.info(f"Generated Title: **{display_title}**")
-    
-    # Create tabs for different versions
-    if len(articles) == 2:
-        tab1, tab2 = st.tabs(["UK English", "US English"])
-        
-        with tab1:
-            # Check if article contains color spans (indicating it's been revised)
-            if '<span style="color:' in articles['UK']:
-                # Display with HTML for color coding
-                if show_word_count:
-                    # Count words without HTML tags for accurate count
-                    clean_text = re.sub(r'<[^>]+>', '', articles['UK'])
-                    st.info(f"Word Count: {len(clean_text.split())} words")
-                if show_keywords and 'current_keywords' in st.session_state:
-                    st.info(f"Keywords: {', '.join(st.session_state.current_keywords)}")
-                st.markdown(articles['UK'], unsafe_allow_html=True)
-            else:
-                # Clean article for display (original behavior)
-                article_uk_display = clean_article_for_display(articles['UK'])
-                if show_word_count:
-                    st.info(f"Word Count: {len(article_uk_display.split())} words")
-                if show_keywords and 'current_keywords' in st.session_state:
-                    st.info(f"Keywords: {', '.join(st.session_state.current_keywords)}")
-                st.markdown(article_uk_display)
-        
-        with tab2:
-            # Check if article contains color spans (indicating it's been revised)
-            if '<span style="color:' in articles['US']:
-                # Display with HTML for color coding
-                if show_word_count:
-                    # Count words without HTML tags for accurate count
-                    clean_text = re.sub(r'<[^>]+>', '', articles['US'])
-                    st.info(f"Word Count: {len(clean_text.split())} words")
-                if show_keywords and 'current_keywords' in st.session_state:
-                    st.info(f"Keywords: {', '.join(st.session_state.current_keywords)}")
-                st.markdown(articles['US'], unsafe_allow_html=True)
-            else:
-                # Clean article for display (original behavior)
-                article_us_display = clean_article_for_display(articles['US'])
-                if show_word_count:
-                    st.info(f"Word Count: {len(article_us_display.split())} words")
-                if show_keywords and 'current_keywords' in st.session_state:
-                    st.info(f"Keywords: {', '.join(st.session_state.current_keywords)}")
-                st.markdown(article_us_display)
-    
-    elif 'UK' in articles:
-        # Check if article contains color spans (indicating it's been revised)
-        if '<span style="color:' in articles['UK']:
-            # Display with HTML for color coding
-            if show_word_count:
-                clean_text = re.sub(r'<[^>]+>', '', articles['UK'])
-                st.info(f"Word Count: {len(clean_text.split())} words")
-            if show_keywords and 'current_keywords' in st.session_state:
-                st.info(f"Keywords: {', '.join(st.session_state.current_keywords)}")
-            st.markdown(articles['UK'], unsafe_allow_html=True)
-        else:
-            # Clean article for display (original behavior)
-            article_uk_display = clean_article_for_display(articles['UK'])
-            if show_word_count:
-                st.info(f"Word Count: {len(article_uk_display.split())} words")
-            if show_keywords and 'current_keywords' in st.session_state:
-                st.info(f"Keywords: {', '.join(st.session_state.current_keywords)}")
-            st.markdown(article_uk_display)
+    # Cleaned text and word counts are computed once per change, not on every rerun
+    display_cache = st.session_state.display_cache
     
+    # Display generated title if present
+    display_title = next(iter(display_cache.values()))['title']
+    if display_title:
+        st.info(f"Generated Title: **{display_title}**")
+    
+    # One tab per version, or a plain container when there is only one
+    if len(display_cache) > 1:
+        containers = st.tabs([f"{loc} English" for loc in display_cache])
     else:
-        # Check if article contains color spans (indicating it's been revised)
-        if '<span style="color:' in articles['US']:
-            # Display with HTML for color coding
-            if show_word_count:
-                clean_text = re.sub(r'<[^>]+>', '', articles['US'])
-                st.info(f"Word Count: {len(clean_text.split())} words")
-            if show_keywords and 'current_keywords' in st.session_state:
-                st.info(f"Keywords: {', '.join(st.session_state.current_keywords)}")
-            st.markdown(articles['US'], unsafe_allow_html=True)
-        else:
-            # Clean article for display (original behavior)
-            article_us_display = clean_article_for_display(articles['US'])
+        containers = [st.container()]
+    
+    for container, entry in zip(containers, display_cache.values()):
+        with container:
             if show_word_count:
-                st.info(f"Word Count: {len(article_us_display.split())} words")
-            if show_keywords and 'current_keywords' in st.session_state:
-                st.info(f"Keywords: {', '.join(st.session_state.current_keywords)}")
-            st.markdown(article_us_display)
+                st.info(f"Word Count: {entry['wc']} words")
+            if show_keywords and 'current_keywords_str' in st.session_state:
+                st.info(f"Keywords: {st.session_state.current_keywords_str}")
+            st.markdown(entry['text'], unsafe_allow_html=entry['html'])
+
+show_articles()
 
 # Footer
 st.markdown("---")
-st.markdown("""
-<div style="text-align: center; padding: 2rem; color: #6c757d; font-size: 0.9rem;">
-    <p>Powered by Claude AI | Enhanced Blog Writing Tool | The Marketing Junction</p>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(_FOOTER_HTML, unsafe_allow_html=True)